@@ -7,13 +7,24 @@ Desktop File Analyzer MCP Server - 桌面文件分析 MCP 服务器
 """
 
 import asyncio
+import hashlib
+import heapq
 import json
 import logging
 import os
 import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice, repeat, takewhile
 from pathlib import Path
-from typing import Any, Dict, List
+from stat import S_ISDIR
+from types import SimpleNamespace
+from typing import Any, List, Tuple
 import mimetypes
 import platform
 
@@ -21,15 +32,206 @@ import platform
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("desktop-analyzer-mcp")
 
+try:
+    from blake3 import blake3 as _content_hasher
+except ImportError:
+    _content_hasher = hashlib.blake2b
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# 目录扫描线程数
+SCAN_WORKERS = 8
+
+# 目录扫描结果的缓存有效期（秒）。目录修改时间只反映增删改名，
+# 不反映其中文件内容的变化，因此缓存只在有效期内复用
+SCAN_CACHE_TTL = 30
+
+# 计算文件摘要时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 标准输入单行请求的最大长度
+STDIN_LINE_LIMIT = 16 * 1024 * 1024
+
+# 文件类别及其扩展名
+_CATEGORIES = {
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg', '.ico'],
+    'document': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'],
+    'spreadsheet': ['.xls', '.xlsx', '.csv', '.ods', '.numbers'],
+    'presentation': ['.ppt', '.pptx', '.odp', '.key'],
+    'video': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'],
+    'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'],
+    'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz'],
+    'executable': ['.exe', '.msi', '.app', '.deb', '.rpm', '.dmg'],
+    'code': ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.php', '.rb', '.go'],
+    'data': ['.json', '.xml', '.yaml', '.sql', '.db', '.sqlite']
+}
+
+# 扩展名 -> 类别 的反向索引，每个文件只需一次字典查找
+_EXT_TO_CATEGORY = {ext: category for category,
+                    exts in _CATEGORIES.items() for ext in exts}
+
+# find_large_files 最多返回的文件数
+LARGE_FILES_LIMIT = 50
+
+# 清理建议中视为大文件的大小
+CLEANUP_LARGE_FILE_SIZE = 50 * 1024 * 1024
+# 读取扫描结果的工具，执行前要等待进行中的扫描完成
+_SCAN_RESULT_TOOLS = frozenset({
+    "analyze_file_types", "find_large_files", "find_duplicate_files",
+    "clean_desktop_suggestions", "search_files", "get_desktop_stats",
+})
+
+# 文件大小单位
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# 文件大小分布区间的上界（字节）及对应标签
+_SIZE_RANGE_BOUNDS = (1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+_SIZE_RANGE_LABELS = ("< 1KB", "1KB - 1MB", "1MB - 10MB",
+                      "10MB - 100MB", "> 100MB")
+
+
+@dataclass(slots=True)
+class FileRecord:
+    """扫描得到的单个文件或目录"""
+    name: str
+    name_lower: str
+    path: str
+    relative_path: str
+    size: int
+    mtime: float
+    is_directory: bool
+    depth: int
+    extension: str = ''
+    category: str = 'other'
+    mimetype: str = 'unknown'
+    is_symlink: bool = False
+
+
+class FileTable:
+    """按列存储的文件记录（不含目录），供统计类工具使用"""
+
+    # 按字典编码存储的字符串列
+    ENCODED_COLUMNS = ('category', 'extension', 'mimetype')
+
+    def __init__(self, files: List[FileRecord]):
+        self.names = [f.name for f in files]
+        self.relative_paths = [f.relative_path for f in files]
+        self.sizes = array('q', [f.size for f in files])
+        self.mtimes = array('d', [f.mtime for f in files])
+
+        # 所有小写文件名以 \x00 连接成一个字符串，并记录每个文件名的起始位置，
+        # 搜索时由 str.find 在 C 层扫描整个字符串，再二分定位到文件
+        self.name_blob = '\x00'.join(f.name_lower for f in files)
+        self.name_starts = array('q')
+        offset = 0
+        for f in files:
+            self.name_starts.append(offset)
+            offset += len(f.name_lower) + 1
+
+        # 每列保存 取值编号 数组和按首次出现顺序排列的取值列表
+        self.codes = {}
+        self.labels = {}
+        for column in self.ENCODED_COLUMNS:
+            index = {}
+            self.codes[column] = array(
+                'I', [index.setdefault(getattr(f, column), len(index)) for f in files])
+            self.labels[column] = list(index)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def search(self, query: str) -> List[int]:
+        """查找小写文件名包含 query 的文件下标，按文件顺序排列"""
+        # 文件名中不会出现 \x00，包含它的查询不可能匹配，也避免跨文件名匹配
+        if not len(self) or '\x00' in query:
+            return []
+
+        blob = self.name_blob
+        starts = self.name_starts
+        matches = []
+        pos = blob.find(query)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            matches.append(i)
+            if i + 1 == len(starts):
+                break
+            # 同一文件名只记录一次，从下一个文件名开始继续查找
+            pos = blob.find(query, starts[i + 1])
+        return matches
+
+    def category(self, i: int) -> str:
+        """获取第 i 个文件的类别"""
+        return self.labels['category'][self.codes['category'][i]]
+
+    def group(self, column: str) -> List[Tuple[str, int, int]]:
+        """按列分组，返回 (取值, 文件数, 总大小) 列表，按首次出现顺序排列"""
+        labels = self.labels[column]
+        counts = [0] * len(labels)
+        totals = [0] * len(labels)
+        for code, size in zip(self.codes[column], self.sizes):
+            counts[code] += 1
+            totals[code] += size
+        return list(zip(labels, counts, totals))
+
+    def size_histogram(self, bounds: Tuple[int, ...]) -> List[int]:
+        """按大小区间统计文件数，第 i 个区间为 [bounds[i-1], bounds[i])"""
+        # map + bisect_right 全部在 C 层完成，不为每个文件执行 Python 字节码
+        counts = Counter(map(bisect_right, repeat(bounds), self.sizes))
+        return [counts[i] for i in range(len(bounds) + 1)]
+
+    def summarize(self) -> SimpleNamespace:
+        """一次性计算统计类工具需要的聚合结果，重新扫描后随新表一起重建"""
+        groups = {column: self.group(column)
+                  for column in self.ENCODED_COLUMNS}
+
+        # 每个类别包含的文件下标，按文件顺序排列
+        category_members = {label: [] for label in self.labels['category']}
+        members = list(category_members.values())
+        for i, code in enumerate(self.codes['category']):
+            members[code].append(i)
+
+        return SimpleNamespace(
+            total_size=sum(self.sizes),
+            groups=groups,
+            category_counts={label: count for label,
+                             count, _ in groups['category']},
+            category_members=category_members,
+            # 只保留最大的 LARGE_FILES_LIMIT 个文件，堆选择为 O(N log K)，无需整体排序
+            largest=heapq.nlargest(
+                LARGE_FILES_LIMIT, range(len(self)), key=self.sizes.__getitem__),
+            cleanup_large_files=[i for i, size in enumerate(self.sizes)
+                                 if size > CLEANUP_LARGE_FILE_SIZE],
+            size_bucket_counts=self.size_histogram(_SIZE_RANGE_BOUNDS),
+        )
+
 
 class DesktopAnalyzerMCPServer:
     """桌面文件分析 MCP 服务器"""
 
+    # 扩展名 -> MIME 类型 的表，进程内共享，每个扩展名只查一次 mimetypes
+    _mime_by_ext = {}
+
     def __init__(self):
         # 获取桌面路径
         self.desktop_path = self._get_desktop_path()
         self.file_cache = {}
+        self.file_table = None
+        self.aggregates = None
         self.last_scan_time = None
+        # (路径, 大小, 修改时间) -> 文件内容摘要 的缓存
+        self._digest_cache = {}
+        # (目录路径, 是否包含隐藏文件) -> (目录修改时间, 扫描时间, 扫描结果) 的缓存
+        self._dir_cache = {}
+        # 扫描期间持有，依赖扫描结果的工具按请求顺序等待扫描完成
+        self._scan_lock = asyncio.Lock()
 
     def _get_desktop_path(self) -> str:
         """获取桌面目录路径"""
@@ -132,13 +334,20 @@ class DesktopAnalyzerMCPServer:
             },
             {
                 "name": "find_duplicate_files",
-                "description": "查找桌面上可能重复的文件（基于文件名模式）",
+                "description": "查找桌面上重复的文件（基于文件内容或文件名模式）",
                 "inputSchema": {
                     "type": "object",
                     "properties": {
+                        "match_by": {
+                            "type": "string",
+                            "description": "匹配方式（content=文件内容相同，name=文件名相似）；"
+                                           "未指定时按内容匹配，若传了 similarity_threshold 则按文件名匹配",
+                            "enum": ["content", "name"],
+                            "default": "content"
+                        },
                         "similarity_threshold": {
                             "type": "number",
-                            "description": "相似度阈值（0-1）",
+                            "description": "文件名相似度阈值（0-1），按文件名匹配时生效",
                             "default": 0.8,
                             "minimum": 0.1,
                             "maximum": 1.0
@@ -193,6 +402,11 @@ class DesktopAnalyzerMCPServer:
     async def call_tool(self, name: str, arguments: dict) -> dict:
         """处理工具调用"""
         try:
+            # 请求并发处理，先收到的扫描要在读取扫描结果之前完成
+            if name in _SCAN_RESULT_TOOLS:
+                async with self._scan_lock:
+                    pass
+
             if name == "scan_desktop":
                 return await self._scan_desktop(arguments)
             elif name == "analyze_file_types":
@@ -223,74 +437,147 @@ class DesktopAnalyzerMCPServer:
                 "content": f"执行工具 '{name}' 时发生错误: {str(e)}"
             }
 
-    def _get_file_category(self, file_path: str) -> str:
+    def _get_extension(self, name: str) -> str:
+        """获取小写扩展名，与 Path(name).suffix.lower() 结果一致"""
+        index = name.rfind('.')
+        if 0 < index < len(name) - 1:
+            return name[index:].lower()
+        return ''
+
+    def _get_stem(self, name: str) -> str:
+        """获取去掉扩展名的文件名，与 Path(name).stem 结果一致"""
+        index = name.rfind('.')
+        if 0 < index < len(name) - 1:
+            return name[:index]
+        return name
+
+    def _get_file_category(self, ext: str) -> str:
         """根据文件扩展名确定文件类别"""
-        ext = Path(file_path).suffix.lower()
-
-        categories = {
-            'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg', '.ico'],
-            'document': ['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.pages'],
-            'spreadsheet': ['.xls', '.xlsx', '.csv', '.ods', '.numbers'],
-            'presentation': ['.ppt', '.pptx', '.odp', '.key'],
-            'video': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'],
-            'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.wma', '.m4a'],
-            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz'],
-            'executable': ['.exe', '.msi', '.app', '.deb', '.rpm', '.dmg'],
-            'code': ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.php', '.rb', '.go'],
-            'data': ['.json', '.xml', '.yaml', '.sql', '.db', '.sqlite']
-        }
+        return _EXT_TO_CATEGORY.get(ext, 'other')
+
+    def _get_mimetype(self, name: str, ext: str) -> str:
+        """根据扩展名获取 MIME 类型，结果按扩展名缓存"""
+        # .gz 等压缩后缀的类型取决于前一个后缀（如 .tar.gz），不做缓存；
+        # encodings_map 区分大小写（如 .Z），要同时检查原始大小写的后缀
+        if ext and (ext in mimetypes.encodings_map
+                    or name[name.rfind('.'):] in mimetypes.encodings_map):
+            return mimetypes.guess_type(name)[0] or 'unknown'
+
+        mime = self._mime_by_ext.get(ext)
+        if mime is None:
+            mime = mimetypes.guess_type('x' + ext)[0] or 'unknown'
+            self._mime_by_ext[ext] = mime
+        return mime
+
+    def _scan_directory(self, path: str, current_depth: int = 1, include_hidden: bool = False,
+                        prefix_len: int = None) -> List[FileRecord]:
+        """扫描单个目录（不递归）"""
+        files = []
+        # 桌面路径加上分隔符的长度，用切片代替 os.path.relpath
+        if prefix_len is None:
+            prefix_len = len(os.path.join(self.desktop_path, ''))
 
-        for category, extensions in categories.items():
-            if ext in extensions:
-                return category
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    item = entry.name
+                    if not include_hidden and item[0] == '.':
+                        continue
+
+                    item_path = entry.path
+
+                    try:
+                        # DirEntry 缓存了 getdents 返回的类型信息，省去额外的 stat 调用
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        stat = entry.stat(follow_symlinks=False)
+
+                        file_info = FileRecord(
+                            name=item,
+                            name_lower=item.lower(),
+                            path=item_path,
+                            relative_path=item_path[prefix_len:],
+                            size=stat.st_size if not is_dir else 0,
+                            mtime=stat.st_mtime,
+                            is_directory=is_dir,
+                            depth=current_depth
+                        )
+
+                        if not is_dir:
+                            ext = self._get_extension(item)
+                            file_info.extension = ext
+                            file_info.category = self._get_file_category(ext)
+                            file_info.mimetype = self._get_mimetype(item, ext)
+                            file_info.is_symlink = entry.is_symlink()
+
+                        files.append(file_info)
+
+                    except (OSError, PermissionError) as e:
+                        logger.warning(f"无法访问 {item_path}: {e}")
+                        continue
 
-        return 'other'
+        except (OSError, PermissionError) as e:
+            logger.error(f"无法读取目录 {path}: {e}")
 
-    def _scan_directory(self, path: str, max_depth: int, current_depth: int = 1, include_hidden: bool = False) -> List[Dict]:
-        """递归扫描目录"""
-        files = []
+        return files
 
+    def _scan_directory_cached(self, path: str, current_depth: int, include_hidden: bool, dir_cache: dict,
+                               prefix_len: int) -> List[FileRecord]:
+        """扫描单个目录，目录修改时间未变且缓存未过期时复用上次的结果"""
+        key = (path, include_hidden)
         try:
-            for item in os.listdir(path):
-                if not include_hidden and item.startswith('.'):
-                    continue
-
-                item_path = os.path.join(path, item)
-
-                try:
-                    stat = os.stat(item_path)
-                    is_dir = os.path.isdir(item_path)
-
-                    file_info = {
-                        'name': item,
-                        'path': item_path,
-                        'relative_path': os.path.relpath(item_path, self.desktop_path),
-                        'size': stat.st_size if not is_dir else 0,
-                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        'is_directory': is_dir,
-                        'depth': current_depth
-                    }
+            dir_mtime = os.stat(path).st_mtime
+        except (OSError, PermissionError) as e:
+            logger.error(f"无法读取目录 {path}: {e}")
+            return []
 
-                    if not is_dir:
-                        file_info['extension'] = Path(item).suffix.lower()
-                        file_info['category'] = self._get_file_category(item)
-                        file_info['mimetype'] = mimetypes.guess_type(item)[
-                            0] or 'unknown'
+        now = time.monotonic()
+        cached = self._dir_cache.get(key)
+        if cached is not None and cached[0] == dir_mtime and now - cached[1] < SCAN_CACHE_TTL:
+            dir_cache[key] = cached
+            return cached[2]
 
-                    files.append(file_info)
+        files = self._scan_directory(path, current_depth, include_hidden, prefix_len)
+        dir_cache[key] = (dir_mtime, now, files)
+        return files
 
-                    # 递归扫描子目录
-                    if is_dir and current_depth < max_depth:
-                        files.extend(self._scan_directory(
-                            item_path, max_depth, current_depth + 1, include_hidden))
+    def _walk_directory(self, path: str, max_depth: int, executor: ThreadPoolExecutor, include_hidden: bool = False) -> List[FileRecord]:
+        """按层并发扫描目录树，结果保持深度优先顺序"""
+        children = {}
+        level = [path]
+        # 只保留本次扫描到的目录，已删除的目录随之从缓存中移除
+        dir_cache = {}
+        # 相对路径前缀长度整次扫描只算一次
+        prefix_len = len(os.path.join(self.desktop_path, ''))
+
+        # 每一层的目录一次性提交到线程池，由调用线程等待结果，
+        # 避免工作线程内部再提交并等待子任务导致线程池死锁
+        for depth in range(1, max_depth + 1):
+            futures = [
+                executor.submit(self._scan_directory_cached,
+                                dir_path, depth, include_hidden, dir_cache, prefix_len)
+                for dir_path in level
+            ]
+            next_level = []
+            for dir_path, future in zip(level, futures):
+                entries = future.result()
+                children[dir_path] = entries
+                next_level.extend(f.path
+                                  for f in entries if f.is_directory)
+            level = next_level
+            if not level:
+                break
 
-                except (OSError, PermissionError) as e:
-                    logger.warning(f"无法访问 {item_path}: {e}")
-                    continue
+        self._dir_cache = dir_cache
 
-        except (OSError, PermissionError) as e:
-            logger.error(f"无法读取目录 {path}: {e}")
+        files = []
+
+        def collect(dir_path: str):
+            for file_info in children.get(dir_path, ()):
+                files.append(file_info)
+                if file_info.is_directory:
+                    collect(file_info.path)
 
+        collect(path)
         return files
 
     async def _scan_desktop(self, arguments: dict) -> dict:
@@ -305,17 +592,23 @@ class DesktopAnalyzerMCPServer:
                 "content": f"❌ 无法找到桌面目录: {self.desktop_path}"
             }
 
-        files = self._scan_directory(
-            self.desktop_path, max_depth, include_hidden=include_hidden)
-        self.file_cache = {f['relative_path']: f for f in files}
-        self.last_scan_time = datetime.now()
+        async with self._scan_lock:
+            # 目录遍历是 I/O 密集型操作，放到线程中执行，避免阻塞事件循环
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+                files = await asyncio.to_thread(
+                    self._walk_directory, self.desktop_path, max_depth, executor, include_hidden)
+            self.file_cache = {f.relative_path: f for f in files}
+            self.file_table = FileTable(
+                [f for f in files if not f.is_directory])
+            self.aggregates = self.file_table.summarize()
+            self.last_scan_time = datetime.now()
 
         # 统计信息
-        total_files = len([f for f in files if not f['is_directory']])
-        total_dirs = len([f for f in files if f['is_directory']])
-        total_size = sum(f['size'] for f in files if not f['is_directory'])
+        total_files = len(self.file_table)
+        total_dirs = len(files) - total_files
+        total_size = self.aggregates.total_size
 
-        result = f"""📁 桌面扫描完成！
+        parts = [f"""📁 桌面扫描完成！
         
 🏠 桌面路径: {self.desktop_path}
 📊 统计信息:
@@ -326,21 +619,21 @@ class DesktopAnalyzerMCPServer:
    • 包含隐藏文件: {'是' if include_hidden else '否'}
 
 📋 前 10 个文件:
-"""
+"""]
 
         for file in files[:10]:
-            if file['is_directory']:
-                result += f"   📁 {file['name']}/\n"
+            if file.is_directory:
+                parts.append(f"   📁 {file.name}/\n")
             else:
-                size_str = self._format_size(file['size'])
-                result += f"   📄 {file['name']} ({size_str}) - {file['category']}\n"
+                size_str = self._format_size(file.size)
+                parts.append(f"   📄 {file.name} ({size_str}) - {file.category}\n")
 
         if len(files) > 10:
-            result += f"   ... 还有 {len(files) - 10} 个项目"
+            parts.append(f"   ... 还有 {len(files) - 10} 个项目")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _analyze_file_types(self, arguments: dict) -> dict:
@@ -354,48 +647,24 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
-        files = [f for f in self.file_cache.values() if not f['is_directory']]
-
-        if group_by == "extension":
-            groups = {}
-            for file in files:
-                ext = file.get('extension', '无扩展名')
-                if ext not in groups:
-                    groups[ext] = {'count': 0, 'size': 0}
-                groups[ext]['count'] += 1
-                groups[ext]['size'] += file['size']
-        elif group_by == "mimetype":
-            groups = {}
-            for file in files:
-                mime = file.get('mimetype', 'unknown')
-                if mime not in groups:
-                    groups[mime] = {'count': 0, 'size': 0}
-                groups[mime]['count'] += 1
-                groups[mime]['size'] += file['size']
-        else:  # category
-            groups = {}
-            for file in files:
-                cat = file.get('category', 'other')
-                if cat not in groups:
-                    groups[cat] = {'count': 0, 'size': 0}
-                groups[cat]['count'] += 1
-                groups[cat]['size'] += file['size']
+        table = self.file_table
+        column = group_by if group_by in ("extension", "mimetype") else "category"
 
         # 按文件数量排序
         sorted_groups = sorted(
-            groups.items(), key=lambda x: x[1]['count'], reverse=True)
+            self.aggregates.groups[column], key=lambda x: x[1], reverse=True)
 
-        result = f"📊 文件类型分析 (按 {group_by} 分组):\n\n"
+        parts = [f"📊 文件类型分析 (按 {group_by} 分组):\n\n"]
 
-        for group_name, data in sorted_groups:
-            percentage = (data['count'] / len(files)) * 100
-            result += f"🔸 {group_name}\n"
-            result += f"   数量: {data['count']} ({percentage:.1f}%)\n"
-            result += f"   大小: {self._format_size(data['size'])}\n\n"
+        for group_name, count, size in sorted_groups:
+            percentage = (count / len(table)) * 100
+            parts.append(f"🔸 {group_name}\n")
+            parts.append(f"   数量: {count} ({percentage:.1f}%)\n")
+            parts.append(f"   大小: {self._format_size(size)}\n\n")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _get_file_details(self, arguments: dict) -> dict:
@@ -404,35 +673,30 @@ class DesktopAnalyzerMCPServer:
 
         file_path = os.path.join(self.desktop_path, filename)
 
-        if not os.path.exists(file_path):
-            return {
-                "success": False,
-                "error": "文件不存在",
-                "content": f"❌ 文件不存在: {filename}"
-            }
-
         try:
+            # 一次 stat 同时完成存在性检查和目录判断
             stat = os.stat(file_path)
-            path_obj = Path(file_path)
+            name = Path(file_path).name
 
             details = {
-                "name": path_obj.name,
+                "name": name,
                 "full_path": file_path,
                 "size": stat.st_size,
                 "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
                 "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 "accessed": datetime.fromtimestamp(stat.st_atime).isoformat(),
-                "is_directory": os.path.isdir(file_path),
+                "is_directory": S_ISDIR(stat.st_mode),
                 "permissions": oct(stat.st_mode)[-3:],
             }
 
             if not details["is_directory"]:
-                details["extension"] = path_obj.suffix.lower()
-                details["category"] = self._get_file_category(file_path)
-                details["mimetype"] = mimetypes.guess_type(file_path)[
-                    0] or 'unknown'
+                details["extension"] = self._get_extension(name)
+                details["category"] = self._get_file_category(
+                    details["extension"])
+                details["mimetype"] = self._get_mimetype(
+                    name, details["extension"])
 
-            result = f"""📄 文件详细信息: {details['name']}
+            parts = [f"""📄 文件详细信息: {details['name']}
 
 📍 路径: {details['full_path']}
 📏 大小: {self._format_size(details['size'])}
@@ -441,18 +705,24 @@ class DesktopAnalyzerMCPServer:
 👁️ 访问时间: {details['accessed']}
 🔒 权限: {details['permissions']}
 📁 类型: {'目录' if details['is_directory'] else '文件'}
-"""
+"""]
 
             if not details["is_directory"]:
-                result += f"""🏷️ 扩展名: {details['extension'] or '无'}
+                parts.append(f"""🏷️ 扩展名: {details['extension'] or '无'}
 📂 类别: {details['category']}
-🎭 MIME类型: {details['mimetype']}"""
+🎭 MIME类型: {details['mimetype']}""")
 
             return {
                 "success": True,
-                "content": result
+                "content": "".join(parts)
             }
 
+        except (FileNotFoundError, NotADirectoryError):
+            return {
+                "success": False,
+                "error": "文件不存在",
+                "content": f"❌ 文件不存在: {filename}"
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -463,7 +733,7 @@ class DesktopAnalyzerMCPServer:
     async def _find_large_files(self, arguments: dict) -> dict:
         """查找大文件"""
         min_size_mb = arguments.get("min_size_mb", 10)
-        limit = arguments.get("limit", 10)
+        limit = max(0, min(arguments.get("limit", 10), LARGE_FILES_LIMIT))
 
         if not self.file_cache:
             return {
@@ -472,15 +742,14 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
+        table = self.file_table
+        sizes = table.sizes
         min_size_bytes = min_size_mb * 1024 * 1024
-        large_files = [
-            f for f in self.file_cache.values()
-            if not f['is_directory'] and f['size'] >= min_size_bytes
-        ]
 
-        # 按大小排序
-        large_files.sort(key=lambda x: x['size'], reverse=True)
-        large_files = large_files[:limit]
+        # 扫描时已选出按大小降序排列的最大文件，只需取满足条件的前 limit 个
+        large_files = list(islice(takewhile(
+            lambda i: sizes[i] >= min_size_bytes,
+            self.aggregates.largest), limit))
 
         if not large_files:
             return {
@@ -488,24 +757,27 @@ class DesktopAnalyzerMCPServer:
                 "content": f"✅ 没有找到大于 {min_size_mb}MB 的文件"
             }
 
-        result = f"🐘 找到 {len(large_files)} 个大文件 (>{min_size_mb}MB):\n\n"
+        parts = [f"🐘 找到 {len(large_files)} 个大文件 (>{min_size_mb}MB):\n\n"]
 
-        for i, file in enumerate(large_files, 1):
-            result += f"{i}. 📄 {file['name']}\n"
-            result += f"   大小: {self._format_size(file['size'])}\n"
-            result += f"   类型: {file['category']}\n"
-            result += f"   路径: {file['relative_path']}\n\n"
+        for rank, i in enumerate(large_files, 1):
+            parts.append(f"{rank}. 📄 {table.names[i]}\n")
+            parts.append(f"   大小: {self._format_size(sizes[i])}\n")
+            parts.append(f"   类型: {table.category(i)}\n")
+            parts.append(f"   路径: {table.relative_paths[i]}\n\n")
 
-        total_size = sum(f['size'] for f in large_files)
-        result += f"💾 总计大小: {self._format_size(total_size)}"
+        total_size = sum(sizes[i] for i in large_files)
+        parts.append(f"💾 总计大小: {self._format_size(total_size)}")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _find_duplicate_files(self, arguments: dict) -> dict:
-        """查找可能重复的文件"""
+        """查找重复的文件"""
+        # 旧调用只传 similarity_threshold，未指定 match_by 时保持按文件名匹配
+        match_by = arguments.get(
+            "match_by", "name" if "similarity_threshold" in arguments else "content")
         similarity_threshold = arguments.get("similarity_threshold", 0.8)
 
         if not self.file_cache:
@@ -515,31 +787,121 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
-        files = [f for f in self.file_cache.values() if not f['is_directory']]
-        duplicates = []
+        files = [f for f in self.file_cache.values() if not f.is_directory]
 
-        # 简单的基于文件名相似度的重复检测
-        for i, file1 in enumerate(files):
-            for file2 in files[i+1:]:
-                # 计算文件名相似度（简单的字符匹配）
-                name1 = Path(file1['name']).stem.lower()
-                name2 = Path(file2['name']).stem.lower()
+        if match_by == "name":
+            return self._find_similar_names(files, similarity_threshold)
+        return await self._find_same_content(files)
 
-                if name1 == name2:
+    def _hash_file(self, path: str):
+        """计算文件内容摘要，无法读取时返回 None"""
+        hasher = _content_hasher()
+        try:
+            with open(path, 'rb') as f:
+                while chunk := f.read(HASH_CHUNK_SIZE):
+                    hasher.update(chunk)
+        except (OSError, PermissionError) as e:
+            logger.warning(f"无法读取 {path}: {e}")
+            return None
+        return hasher.hexdigest()
+
+    async def _find_same_content(self, files: List[FileRecord]) -> dict:
+        """查找内容完全相同的文件"""
+        # 先按大小分组，只有大小相同的非空文件才需要计算摘要；
+        # 符号链接记录的是链接本身的大小，而读取内容会跟随到目标文件，不参与内容匹配
+        by_size = {}
+        for file in files:
+            if file.size > 0 and not file.is_symlink:
+                by_size.setdefault(file.size, []).append(file)
+        candidates = [f for group in by_size.values()
+                      if len(group) > 1 for f in group]
+
+        # 未变化的文件直接复用上次计算的摘要
+        keys = [(f.path, f.size, f.mtime) for f in candidates]
+        digests = {key: self._digest_cache[key]
+                   for key in keys if key in self._digest_cache}
+        pending = [key for key in keys if key not in digests]
+        if pending:
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(executor, self._hash_file, key[0])
+                    for key in pending
+                ))
+            digests.update((key, digest) for key, digest in zip(
+                pending, results) if digest is not None)
+        self._digest_cache = digests
+
+        groups = {}
+        for file, key in zip(candidates, keys):
+            digest = digests.get(key)
+            if digest is not None:
+                groups.setdefault((file.size, digest), []).append(file)
+        duplicates = [group for group in groups.values() if len(group) > 1]
+
+        if not duplicates:
+            return {
+                "success": True,
+                "content": "✅ 没有找到内容相同的重复文件"
+            }
+
+        parts = [f"🔍 找到 {len(duplicates)} 组内容相同的文件:\n\n"]
+
+        wasted_size = 0
+        for i, group in enumerate(duplicates, 1):
+            size = group[0].size
+            wasted_size += size * (len(group) - 1)
+            parts.append(f"{i}. {len(group)} 个文件，每个 {self._format_size(size)}\n")
+            for file in group:
+                parts.append(f"   📄 {file.relative_path}\n")
+            parts.append("\n")
+
+        parts.append(f"💾 可释放空间: {self._format_size(wasted_size)}")
+
+        return {
+            "success": True,
+            "content": "".join(parts)
+        }
+
+    def _find_similar_names(self, files: List[FileRecord], similarity_threshold: float) -> dict:
+        """查找文件名相似的文件"""
+        # 简单的基于文件名相似度的重复检测（文件名字符集合的 Jaccard 相似度）
+        stems = [self._get_stem(f.name).lower() for f in files]
+        char_sets = [frozenset(stem) for stem in stems]
+
+        # 按字符集大小升序比较：当 |A| <= |B| 时相似度不超过 |A| / |B|，
+        # 一旦该比值低于阈值，后面更大的集合都可以直接跳过
+        order = sorted(range(len(files)), key=lambda i: len(char_sets[i]))
+        pairs = []
+        for pos, i in enumerate(order):
+            set1 = char_sets[i]
+            len1 = len(set1)
+            for j in order[pos + 1:]:
+                set2 = char_sets[j]
+                len2 = len(set2)
+                if len2 and len1 / len2 < similarity_threshold:
+                    break
+
+                if stems[i] == stems[j]:
                     similarity = 1.0
                 else:
-                    # 简单的相似度计算
-                    common_chars = set(name1) & set(name2)
-                    total_chars = set(name1) | set(name2)
-                    similarity = len(common_chars) / \
-                        len(total_chars) if total_chars else 0
+                    common = len(set1 & set2)
+                    total = len1 + len2 - common
+                    similarity = common / total if total else 0
 
                 if similarity >= similarity_threshold:
-                    duplicates.append({
-                        'file1': file1,
-                        'file2': file2,
-                        'similarity': similarity
-                    })
+                    pairs.append((min(i, j), max(i, j), similarity))
+
+        # 保持与文件顺序一致的输出
+        pairs.sort()
+        duplicates = [
+            {
+                'file1': files[i],
+                'file2': files[j],
+                'similarity': similarity
+            }
+            for i, j, similarity in pairs
+        ]
 
         if not duplicates:
             return {
@@ -547,16 +909,16 @@ class DesktopAnalyzerMCPServer:
                 "content": f"✅ 没有找到相似度大于 {similarity_threshold:.0%} 的重复文件"
             }
 
-        result = f"🔍 找到 {len(duplicates)} 组可能重复的文件:\n\n"
+        parts = [f"🔍 找到 {len(duplicates)} 组可能重复的文件:\n\n"]
 
         for i, dup in enumerate(duplicates, 1):
-            result += f"{i}. 相似度: {dup['similarity']:.0%}\n"
-            result += f"   📄 {dup['file1']['name']} ({self._format_size(dup['file1']['size'])})\n"
-            result += f"   📄 {dup['file2']['name']} ({self._format_size(dup['file2']['size'])})\n\n"
+            parts.append(f"{i}. 相似度: {dup['similarity']:.0%}\n")
+            parts.append(f"   📄 {dup['file1'].name} ({self._format_size(dup['file1'].size)})\n")
+            parts.append(f"   📄 {dup['file2'].name} ({self._format_size(dup['file2'].size)})\n\n")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _clean_desktop_suggestions(self, arguments: dict) -> dict:
@@ -570,78 +932,65 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
-        files = [f for f in self.file_cache.values() if not f['is_directory']]
+        table = self.file_table
+        aggregates = self.aggregates
 
         if analysis_type == "organization":
             # 按类别分组建议
-            categories = {}
-            for file in files:
-                cat = file['category']
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(file)
-
-            result = "📋 桌面整理建议:\n\n"
+            parts = ["📋 桌面整理建议:\n\n"]
 
-            for category, cat_files in categories.items():
+            for category, cat_files in aggregates.category_members.items():
                 if len(cat_files) > 2:  # 只对有多个文件的类别提供建议
-                    result += f"📁 建议创建 '{category}' 文件夹，移入 {len(cat_files)} 个文件:\n"
-                    for file in cat_files[:5]:  # 只显示前5个
-                        result += f"   • {file['name']}\n"
+                    parts.append(f"📁 建议创建 '{category}' 文件夹，移入 {len(cat_files)} 个文件:\n")
+                    for i in cat_files[:5]:  # 只显示前5个
+                        parts.append(f"   • {table.names[i]}\n")
                     if len(cat_files) > 5:
-                        result += f"   ... 还有 {len(cat_files) - 5} 个文件\n"
-                    result += "\n"
+                        parts.append(f"   ... 还有 {len(cat_files) - 5} 个文件\n")
+                    parts.append("\n")
 
         elif analysis_type == "cleanup":
             # 清理建议
-            large_files = [f for f in files if f['size']
-                           > 50 * 1024 * 1024]  # >50MB
-            old_files = []
+            large_files = aggregates.cleanup_large_files  # >50MB
 
-            # 查找旧文件（超过30天未修改）
-            now = datetime.now()
-            for file in files:
-                modified = datetime.fromisoformat(file['modified'])
-                if (now - modified).days > 30:
-                    old_files.append(file)
+            # 查找旧文件（超过30天未修改，即满 31 整天），直接比较时间戳
+            now_ts = time.time()
+            old_cutoff = now_ts - 31 * 86400
+            old_files = [i for i, mtime in enumerate(table.mtimes)
+                         if mtime <= old_cutoff]
 
-            result = "🧹 桌面清理建议:\n\n"
+            parts = ["🧹 桌面清理建议:\n\n"]
 
             if large_files:
-                result += f"🐘 大文件清理 ({len(large_files)} 个文件):\n"
-                for file in large_files[:5]:
-                    result += f"   • {file['name']} - {self._format_size(file['size'])}\n"
-                result += "\n"
+                parts.append(f"🐘 大文件清理 ({len(large_files)} 个文件):\n")
+                for i in large_files[:5]:
+                    parts.append(f"   • {table.names[i]} - {self._format_size(table.sizes[i])}\n")
+                parts.append("\n")
 
             if old_files:
-                result += f"📅 旧文件清理 ({len(old_files)} 个文件):\n"
-                for file in old_files[:5]:
-                    days_old = (
-                        now - datetime.fromisoformat(file['modified'])).days
-                    result += f"   • {file['name']} - {days_old} 天前修改\n"
-                result += "\n"
+                parts.append(f"📅 旧文件清理 ({len(old_files)} 个文件):\n")
+                for i in old_files[:5]:
+                    days_old = int((now_ts - table.mtimes[i]) // 86400)
+                    parts.append(f"   • {table.names[i]} - {days_old} 天前修改\n")
+                parts.append("\n")
 
         else:  # optimization
-            result = "⚡ 桌面优化建议:\n\n"
+            parts = ["⚡ 桌面优化建议:\n\n"]
 
-            total_files = len(files)
+            total_files = len(table)
             if total_files > 20:
-                result += f"📊 桌面文件过多 ({total_files} 个)，建议整理\n\n"
+                parts.append(f"📊 桌面文件过多 ({total_files} 个)，建议整理\n\n")
 
-            # 统计各类型文件
-            categories = {}
-            for file in files:
-                cat = file['category']
-                categories[cat] = categories.get(cat, 0) + 1
+            # 各类型文件数量
+            categories = aggregates.category_counts
 
-            result += "📈 文件类型分布建议:\n"
+            parts.append("📈 文件类型分布建议:\n")
             for cat, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
                 if count > 3:
-                    result += f"   • {cat}: {count} 个文件 - 建议分类整理\n"
+                    parts.append(f"   • {cat}: {count} 个文件 - 建议分类整理\n")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _search_files(self, arguments: dict) -> dict:
@@ -656,7 +1005,10 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
-        files = [f for f in self.file_cache.values() if not f['is_directory']]
+        table = self.file_table
+
+        # 搜索匹配（文件名在扫描时已转为小写并连接成一个字符串）
+        matches = table.search(query)
 
         # 按文件类型过滤
         if file_type != "all":
@@ -673,14 +1025,8 @@ class DesktopAnalyzerMCPServer:
                 allowed_categories = type_mapping[file_type]
                 if isinstance(allowed_categories, str):
                     allowed_categories = [allowed_categories]
-                files = [f for f in files if f['category']
-                         in allowed_categories]
-
-        # 搜索匹配
-        matches = []
-        for file in files:
-            if query in file['name'].lower():
-                matches.append(file)
+                matches = [i for i in matches if table.category(i)
+                           in allowed_categories]
 
         if not matches:
             return {
@@ -688,20 +1034,20 @@ class DesktopAnalyzerMCPServer:
                 "content": f"🔍 没有找到包含 '{query}' 的文件"
             }
 
-        result = f"🔍 搜索 '{query}' 找到 {len(matches)} 个文件:\n\n"
+        parts = [f"🔍 搜索 '{query}' 找到 {len(matches)} 个文件:\n\n"]
 
-        for i, file in enumerate(matches[:20], 1):  # 限制显示20个结果
-            result += f"{i}. 📄 {file['name']}\n"
-            result += f"   大小: {self._format_size(file['size'])}\n"
-            result += f"   类型: {file['category']}\n"
-            result += f"   路径: {file['relative_path']}\n\n"
+        for rank, i in enumerate(matches[:20], 1):  # 限制显示20个结果
+            parts.append(f"{rank}. 📄 {table.names[i]}\n")
+            parts.append(f"   大小: {self._format_size(table.sizes[i])}\n")
+            parts.append(f"   类型: {table.category(i)}\n")
+            parts.append(f"   路径: {table.relative_paths[i]}\n\n")
 
         if len(matches) > 20:
-            result += f"... 还有 {len(matches) - 20} 个匹配文件"
+            parts.append(f"... 还有 {len(matches) - 20} 个匹配文件")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     async def _get_desktop_stats(self, arguments: dict) -> dict:
@@ -713,43 +1059,21 @@ class DesktopAnalyzerMCPServer:
                 "content": "❌ 请先使用 scan_desktop 工具扫描桌面"
             }
 
-        files = [f for f in self.file_cache.values() if not f['is_directory']]
-        dirs = [f for f in self.file_cache.values() if f['is_directory']]
+        aggregates = self.aggregates
 
         # 基本统计
-        total_files = len(files)
-        total_dirs = len(dirs)
-        total_size = sum(f['size'] for f in files)
+        total_files = len(self.file_table)
+        total_dirs = len(self.file_cache) - total_files
+        total_size = aggregates.total_size
 
         # 类别统计
-        categories = {}
-        for file in files:
-            cat = file['category']
-            categories[cat] = categories.get(cat, 0) + 1
+        categories = aggregates.category_counts
 
         # 大小统计
-        size_ranges = {
-            "< 1KB": 0,
-            "1KB - 1MB": 0,
-            "1MB - 10MB": 0,
-            "10MB - 100MB": 0,
-            "> 100MB": 0
-        }
-
-        for file in files:
-            size = file['size']
-            if size < 1024:
-                size_ranges["< 1KB"] += 1
-            elif size < 1024 * 1024:
-                size_ranges["1KB - 1MB"] += 1
-            elif size < 10 * 1024 * 1024:
-                size_ranges["1MB - 10MB"] += 1
-            elif size < 100 * 1024 * 1024:
-                size_ranges["10MB - 100MB"] += 1
-            else:
-                size_ranges["> 100MB"] += 1
+        size_ranges = dict(
+            zip(_SIZE_RANGE_LABELS, aggregates.size_bucket_counts))
 
-        result = f"""📊 桌面统计报告
+        parts = [f"""📊 桌面统计报告
         
 🏠 桌面路径: {self.desktop_path}
 📅 最后扫描: {self.last_scan_time.strftime('%Y-%m-%d %H:%M:%S') if self.last_scan_time else '未知'}
@@ -761,42 +1085,41 @@ class DesktopAnalyzerMCPServer:
    • 平均文件大小: {self._format_size(total_size / total_files) if total_files > 0 else '0 B'}
 
 📂 文件类别分布:
-"""
+"""]
 
         for category, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
             percentage = (count / total_files) * 100 if total_files > 0 else 0
-            result += f"   • {category}: {count} ({percentage:.1f}%)\n"
+            parts.append(f"   • {category}: {count} ({percentage:.1f}%)\n")
 
-        result += "\n📏 文件大小分布:\n"
+        parts.append("\n📏 文件大小分布:\n")
         for size_range, count in size_ranges.items():
             percentage = (count / total_files) * 100 if total_files > 0 else 0
-            result += f"   • {size_range}: {count} ({percentage:.1f}%)\n"
+            parts.append(f"   • {size_range}: {count} ({percentage:.1f}%)\n")
 
         return {
             "success": True,
-            "content": result
+            "content": "".join(parts)
         }
 
     def _format_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
-        if size_bytes == 0:
-            return "0 B"
+        if size_bytes < 1024:
+            return f"{int(size_bytes)} B"
 
-        units = ['B', 'KB', 'MB', 'GB', 'TB']
-        size = float(size_bytes)
-        unit_index = 0
+        # 每 10 位对应一个单位，通过 bit_length 直接确定单位，无需循环相除
+        unit_index = min((int(size_bytes).bit_length() - 1) // 10, 4)
+        size = size_bytes / (1 << (10 * unit_index))
+        return f"{size:.1f} {_SIZE_UNITS[unit_index]}"
 
-        while size >= 1024 and unit_index < len(units) - 1:
-            size /= 1024
-            unit_index += 1
 
-        if unit_index == 0:
-            return f"{int(size)} {units[unit_index]}"
-        else:
-            return f"{size:.1f} {units[unit_index]}"
+# MCP 协议处理
+def _json_dumps(obj: Any) -> str:
+    """序列化为 JSON 字符串，安装了 orjson 时优先使用"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
 
 
-# MCP 协议处理
 def create_mcp_response(request_id: str, result: Any) -> str:
     """创建 MCP 响应"""
     response = {
@@ -804,7 +1127,7 @@ def create_mcp_response(request_id: str, result: Any) -> str:
         "id": request_id,
         "result": result
     }
-    return json.dumps(response)
+    return _json_dumps(response)
 
 
 def create_mcp_error(request_id: str, code: int, message: str) -> str:
@@ -817,7 +1140,7 @@ def create_mcp_error(request_id: str, code: int, message: str) -> str:
             "message": message
         }
     }
-    return json.dumps(response)
+    return _json_dumps(response)
 
 
 async def handle_mcp_request(server: DesktopAnalyzerMCPServer, request: dict) -> str:
@@ -872,31 +1195,68 @@ async def handle_mcp_request(server: DesktopAnalyzerMCPServer, request: dict) ->
         return create_mcp_error(request_id, -32603, f"内部错误: {str(e)}")
 
 
+async def process_line(server: DesktopAnalyzerMCPServer, line: str):
+    """处理一行请求并写出响应"""
+    try:
+        request = json.loads(line.strip())
+        logger.info(f"请求: {request}")
+        response = await handle_mcp_request(server, request)
+        # 按 UTF-8 写出，不依赖控制台编码（orjson 输出不转义非 ASCII 字符）
+        sys.stdout.buffer.write(response.encode() + b"\n")
+        sys.stdout.buffer.flush()
+    except json.JSONDecodeError:
+        logger.error(f"无效的 JSON 请求: {line}")
+    except Exception as e:
+        logger.error(f"处理请求时发生错误: {e}")
+
+
+async def open_stdin_reader():
+    """将标准输入接入事件循环，不支持时（如重定向自普通文件）返回 None"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STDIN_LINE_LIMIT)
+    protocol = asyncio.StreamReaderProtocol(reader)
+    try:
+        await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+    except (ValueError, OSError, NotImplementedError) as e:
+        logger.warning(f"无法异步读取标准输入，改为在线程中读取: {e}")
+        return None
+    return reader
+
+
 async def main():
     """主函数 - 启动 stdio MCP 服务器"""
     server = DesktopAnalyzerMCPServer()
     logger.info(f"🚀 启动桌面分析 MCP Server... (桌面路径: {server.desktop_path})")
 
+    reader = await open_stdin_reader()
+    tasks = set()
+
     try:
         while True:
-            # 从标准输入读取请求
-            line = sys.stdin.readline()
+            # 从标准输入读取请求，读取时不阻塞事件循环
+            if reader is not None:
+                line = (await reader.readline()).decode()
+            else:
+                line = await asyncio.to_thread(sys.stdin.readline)
             if not line:
                 break
 
-            try:
-                request = json.loads(line.strip())
-                logger.info(f"请求: {request}")
-                response = await handle_mcp_request(server, request)
-                print(response, flush=True)
-            except json.JSONDecodeError:
-                logger.error(f"无效的 JSON 请求: {line}")
-            except Exception as e:
-                logger.error(f"处理请求时发生错误: {e}")
+            # 每个请求作为独立任务处理，多个请求可以并发执行
+            task = asyncio.create_task(process_line(server, line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        # 输入结束后等待未完成的请求写出响应
+        if tasks:
+            await asyncio.gather(*tasks)
 
     except KeyboardInterrupt:
         logger.info("服务器已停止")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # 安装了 uvloop 时使用基于 libuv 的事件循环
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
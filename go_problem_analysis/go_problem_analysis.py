@@ -5,33 +5,165 @@ from mcp.server.fastmcp import FastMCP
 from pydantic import AnyUrl
 import json
 import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
 from typing import Dict, Any
 from kubernetes import client
+import atexit
 import base64
 import tempfile
 import yaml
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
 import os
-import requests
-# import time
+import shlex
+import shutil
+import time
+import aiohttp
+import aiofiles
 import uuid
-import subprocess
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 # import anyio
 
 # read_resources 获取服务pod ip
 # read_resources 获取pod pprof 信息
 # read_resources 获取服务metrics
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP):
+    """服务退出时关闭共享的HTTP会话"""
+    try:
+        yield {}
+    finally:
+        if _http_session is not None and not _http_session.closed:
+            await _http_session.close()
+
+
 mcp = FastMCP(
     name="go-problem-analysis",
     version="1.0.0",
-    description="Go应用性能问题分析工具"
+    description="Go应用性能问题分析工具",
+    lifespan=server_lifespan,
 )
 
 
 kube_config_path = "~/.kube/config"
 
 
-def setup_ssl_from_kubeconfig() -> client.CoreV1Api:
-    """从kubeconfig提取证书并设置SSL"""
+@dataclass(slots=True)
+class PodPprofResult:
+    """单个pod的一次pprof采集"""
+    ip: str
+    namespace: str
+    service_name: str
+    profile_uuid: str
+
+
+@dataclass(slots=True)
+class PodPprofError:
+    """单个pod采集失败的原因"""
+    ip: str
+    namespace: str
+    service_name: str
+    error: str
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """一次go tool pprof分析的结果"""
+    pprof_type: str
+    analysis_type: str
+    analysis_result: Dict[str, Any]
+
+
+# pprof采样时长(秒), HTTP读超时必须留出足够余量, 否则采样稍有超时就会丢掉整个文件
+SAMPLE_SECONDS = 30
+PPROF_TIMEOUT = aiohttp.ClientTimeout(
+    sock_read=SAMPLE_SECONDS * 2 + 30, total=SAMPLE_SECONDS * 2 + 60)
+# 下载pprof文件时每次写盘的块大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# pprof文件的保存目录和保留时间(秒), 过期的采集目录在后台删除
+PPROF_ROOT = "/tmp/pprof"
+PPROF_MAX_AGE = 3600
+_cleanup_task: asyncio.Task = None
+# (namespace, service_name) -> (过期时间, pod IP列表), pod IP通常几分钟才变化一次
+POD_IP_CACHE_TTL = 30
+POD_IP_CACHE_SIZE = 1024
+_pod_ip_cache: OrderedDict = OrderedDict()
+# 列出pod时每页的数量
+POD_LIST_PAGE_SIZE = 500
+# 进程内共享的HTTP会话, 多次采集之间复用连接和DNS结果
+_http_session: aiohttp.ClientSession = None
+# 每个pod的连接上限: 最多2个采集同时进行, 每个采集对一个pod发起profile和heap两个请求
+PPROF_CONNECTIONS_PER_HOST = 4
+# go tool pprof 是CPU密集型, 同时运行的分析进程数不超过CPU核数
+_pprof_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+# 同一服务的采集串行执行, 避免两次CPU profile重叠互相干扰
+# (namespace, service_name) -> [锁, 持有和等待的数量], 无人使用时删除, 避免随服务数无限增长
+_capture_locks: Dict[tuple, list] = {}
+# 全局同时进行的采集不超过2个
+_capture_semaphore = asyncio.Semaphore(2)
+# (文件路径, 分析类型, 文件修改时间) -> go tool pprof 执行结果, 按LRU淘汰
+PPROF_CACHE_SIZE = 128
+_pprof_cache: OrderedDict = OrderedDict()
+# (kubeconfig路径, 修改时间) -> (CoreV1Api, 证书句柄列表), kubeconfig未变化时复用客户端
+_kube_cli_cache: Dict[tuple, tuple] = {}
+
+
+def _write_temp_cert(data: str, suffix: str, cert_handles: list) -> str:
+    """把base64编码的证书写入文件并返回路径, Linux上使用内存文件, 证书不落盘
+
+    内存文件的描述符或临时文件路径记录到 cert_handles, 由 _release_certs 释放
+    """
+    content = base64.b64decode(data)
+    # kubernetes客户端只接受证书路径, 内存文件通过 /proc/self/fd 提供路径
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create(f"kube-cert{suffix}")
+        with os.fdopen(fd, 'wb', closefd=False) as f:
+            f.write(content)
+        cert_handles.append(fd)
+        return f"/proc/self/fd/{fd}"
+
+    with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix=suffix) as f:
+        f.write(content)
+    cert_handles.append(f.name)
+    return f.name
+
+
+def _release_certs(cert_handles: list):
+    """关闭证书内存文件或删除临时证书文件"""
+    for handle in cert_handles:
+        try:
+            if isinstance(handle, int):
+                os.close(handle)
+            else:
+                os.unlink(handle)
+        except OSError:
+            pass
+    cert_handles.clear()
+
+
+def _cleanup_temp_certs():
+    for _, cert_handles in _kube_cli_cache.values():
+        _release_certs(cert_handles)
+
+
+atexit.register(_cleanup_temp_certs)
+
+
+def setup_ssl_from_kubeconfig(cert_handles: list) -> client.CoreV1Api:
+    """从kubeconfig提取证书并设置SSL, 写出的证书句柄记录到 cert_handles"""
     try:
         kubeconfig_path = os.path.expanduser(kube_config_path)
 
@@ -41,7 +173,8 @@ def setup_ssl_from_kubeconfig() -> client.CoreV1Api:
             return None
 
         with open(kubeconfig_path, 'r') as f:
-            kubeconfig = yaml.safe_load(f)
+            # 优先使用 libyaml 的C解析器, 未编译时退回纯Python实现
+            kubeconfig = yaml.load(f, Loader=YamlSafeLoader)
 
         # 获取当前context的集群信息
         current_context = kubeconfig.get('current-context')
@@ -67,30 +200,22 @@ def setup_ssl_from_kubeconfig() -> client.CoreV1Api:
 
         # 处理CA证书
         if 'certificate-authority-data' in cluster:
-            ca_cert_data = base64.b64decode(
-                cluster['certificate-authority-data'])
-            with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.crt') as ca_file:
-                ca_file.write(ca_cert_data)
-                configuration.ssl_ca_cert = ca_file.name
+            configuration.ssl_ca_cert = _write_temp_cert(
+                cluster['certificate-authority-data'], '.crt', cert_handles)
         elif 'certificate-authority' in cluster:
             configuration.ssl_ca_cert = cluster['certificate-authority']
 
         # 处理客户端证书
         if 'client-certificate-data' in user:
-            client_cert_data = base64.b64decode(
-                user['client-certificate-data'])
-            with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.crt') as cert_file:
-                cert_file.write(client_cert_data)
-                configuration.cert_file = cert_file.name
+            configuration.cert_file = _write_temp_cert(
+                user['client-certificate-data'], '.crt', cert_handles)
         elif 'client-certificate' in user:
             configuration.cert_file = user['client-certificate']
 
         # 处理客户端密钥
         if 'client-key-data' in user:
-            client_key_data = base64.b64decode(user['client-key-data'])
-            with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.key') as key_file:
-                key_file.write(client_key_data)
-                configuration.key_file = key_file.name
+            configuration.key_file = _write_temp_cert(
+                user['client-key-data'], '.key', cert_handles)
         elif 'client-key' in user:
             configuration.key_file = user['client-key']
 
@@ -112,6 +237,30 @@ def setup_ssl_from_kubeconfig() -> client.CoreV1Api:
         return None
 
 
+def get_kube_cli() -> client.CoreV1Api:
+    """获取Kubernetes客户端, kubeconfig未修改时复用已创建的客户端"""
+    kubeconfig_path = os.path.expanduser(kube_config_path)
+    try:
+        mtime = os.stat(kubeconfig_path).st_mtime
+    except OSError:
+        mtime = None
+    key = (kubeconfig_path, mtime)
+    cached = _kube_cli_cache.get(key)
+    if cached is not None:
+        return cached[0]
+
+    cert_handles = []
+    kube_cli = setup_ssl_from_kubeconfig(cert_handles)
+    if kube_cli is None:
+        _release_certs(cert_handles)
+        return None
+    # kubeconfig已变化, 释放旧客户端的证书文件
+    _cleanup_temp_certs()
+    _kube_cli_cache.clear()
+    _kube_cli_cache[key] = (kube_cli, cert_handles)
+    return kube_cli
+
+
 def list_resources() -> list[types.Resource]:
     return [
         types.Resource(
@@ -129,6 +278,20 @@ def list_resources() -> list[types.Resource]:
             """,
             mime_type="text/plain",
         ),
+        types.Resource(
+            uri=AnyUrl(
+                "resource://pods/pprof/{targets}"),
+            name="load_services_pprof",
+            kind="load_services_pprof",
+            description="""
+            同时获取多个服务的pod pprof信息
+            @Params:
+            - targets: 命名空间:服务名称, 多个服务使用 | 分隔
+            @Example:
+            - /pods/pprof/im:user-recommender|im:user-profile
+            """,
+            mime_type="text/plain",
+        ),
         types.Resource(
             uri=AnyUrl(
                 "resource://pod/pprof/{namespace}/{service_name}/{uuid}/{analysis_types}"),
@@ -149,72 +312,273 @@ def list_resources() -> list[types.Resource]:
     ]
 
 
+def _json_dumps(data: Any) -> str:
+    """序列化为JSON字符串, 安装了orjson时优先使用(可直接序列化dataclass)"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False, default=asdict)
+
+
+def _json_loads(data: bytes) -> Any:
+    """解析JSON, 安装了orjson时优先使用"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """获取共享的HTTP会话, 首次使用时在当前事件循环中创建"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        # 不限制总连接数: 等待连接池的时间也计入 PPROF_TIMEOUT.total,
+        # 总数限流会让pod多的服务排队超时; 总并发由 _capture_semaphore 和pod数决定,
+        # 单个pod的连接数由 limit_per_host 限制, 正常采集不会触发排队
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=0, limit_per_host=PPROF_CONNECTIONS_PER_HOST, ttl_dns_cache=300),
+            timeout=PPROF_TIMEOUT,
+        )
+    return _http_session
+
+
+async def download_pprof(session: aiohttp.ClientSession, url: str, file_path: str):
+    """下载pprof文件, 按块直接写入磁盘, 不在内存中保留整个文件"""
+    async with session.get(url) as response:
+        # 非2xx说明pod已不是采集目标(如IP被复用), 不把错误页面当作pprof保存
+        response.raise_for_status()
+        async with aiofiles.open(file_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                await f.write(chunk)
+
+
+async def fetch_pod_pprof(session: aiohttp.ClientSession, namespace: str, service_name: str, ip: str) -> PodPprofResult:
+    """下载单个pod的profile和heap文件"""
+    profile_url = f"http://{ip}:8080/debug/pprof/profile?seconds={SAMPLE_SECONDS}"
+    heap_url = f"http://{ip}:8080/debug/pprof/heap?seconds={SAMPLE_SECONDS}"
+    # 每次采集一个目录: /tmp/pprof/namespace/service_name/uuid/{profile,heap}.pb.gz
+    curr_uuid = str(uuid.uuid4())
+    capture_path = get_capture_path(namespace, service_name, curr_uuid)
+    os.makedirs(capture_path, exist_ok=True)
+    # profile和heap的采样互不影响, 同时发起, 耗时只算一次采样时长
+    results = await asyncio.gather(
+        download_pprof(session, profile_url,
+                       f"{capture_path}/profile.pb.gz"),
+        download_pprof(session, heap_url,
+                       f"{capture_path}/heap.pb.gz"),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # 下载失败时删除整个目录, 不留下不完整的文件
+        shutil.rmtree(capture_path, ignore_errors=True)
+        raise errors[0]
+    return PodPprofResult(ip, namespace, service_name, curr_uuid)
+
+
+def get_capture_path(namespace: str, service_name: str, capture_uuid: str) -> str:
+    """获取一次采集的文件目录"""
+    return f"{PPROF_ROOT}/{namespace}/{service_name}/{capture_uuid}"
+
+
+def cleanup_old_captures(root: str, max_age: float):
+    """删除超过保留时间的采集目录"""
+    deadline = time.time() - max_age
+    try:
+        namespaces = [e.path for e in os.scandir(root) if e.is_dir()]
+    except OSError:
+        return
+    for namespace_path in namespaces:
+        try:
+            services = [e.path for e in os.scandir(namespace_path) if e.is_dir()]
+        except OSError:
+            continue
+        for service_path in services:
+            try:
+                entries = list(os.scandir(service_path))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime >= deadline:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+
+
+def schedule_capture_cleanup():
+    """在后台清理过期的采集目录, 同一时间只运行一个清理任务"""
+    global _cleanup_task
+    if _cleanup_task is None or _cleanup_task.done():
+        _cleanup_task = asyncio.create_task(asyncio.to_thread(
+            cleanup_old_captures, PPROF_ROOT, PPROF_MAX_AGE))
+
+
+@asynccontextmanager
+async def capture_lock(namespace: str, service_name: str):
+    """获取服务的采集锁, 释放后没有其他等待者时从锁表中删除"""
+    key = (namespace, service_name)
+    entry = _capture_locks.get(key)
+    if entry is None:
+        entry = _capture_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _capture_locks[key]
+
+
+async def capture_service_pprof(namespace: str, service_name: str) -> list:
+    """采集服务下所有pod的pprof文件, 失败的pod以 PodPprofError 返回"""
+    schedule_capture_cleanup()
+    async with capture_lock(namespace, service_name), _capture_semaphore:
+        ip_list = await get_svc_pods_ip(namespace, service_name)
+        # 所有pod并发采集，总耗时约等于单个pod的采集时间;
+        # 等待全部pod结束后才释放锁, 单个pod失败不会让其余采样在锁外继续运行
+        session = get_http_session()
+        results = await asyncio.gather(*[
+            fetch_pod_pprof(session, namespace, service_name, ip)
+            for ip in ip_list
+        ], return_exceptions=True)
+
+    data = []
+    failed = False
+    for ip, result in zip(ip_list, results):
+        if isinstance(result, BaseException):
+            failed = True
+            data.append(PodPprofError(
+                ip, namespace, service_name, str(result) or type(result).__name__))
+        else:
+            data.append(result)
+    if failed:
+        # 缓存的pod IP可能已失效, 下次重新查询
+        _pod_ip_cache.pop((namespace, service_name), None)
+    return data
+
+
 @mcp.resource(uri="resource://pod/pprof/{namespace}/{service_name}")
 async def load_pod_pprof(namespace: str, service_name: str) -> types.ReadResourceResult:
-    ip_list = await get_svc_pods_ip(namespace, service_name)
-    data = []
-    for ip in ip_list:
-        profile_url = f"http://{ip}:8080/debug/pprof/profile?seconds=30"
-        heap_url = f"http://{ip}:8080/debug/pprof/heap?seconds=30"
-        profile_response = requests.get(profile_url, timeout=60)
-        heap_response = requests.get(heap_url, timeout=60)
-        # print(response.text)
-        # save load pprof file or heap file, file name with service name, ip, profile or heap, time, uuid  suffix is pb.gz
-        # save file to /tmp/pprof/service_name/ip/profile_time_uuid.pb.gz
-        base_path = f"/tmp/pprof/{namespace}/{service_name}"
-        os.makedirs(base_path, exist_ok=True)
-        curr_uuid = str(uuid.uuid4())
-        with open(f"{base_path}/profile_{curr_uuid}.pb.gz", "wb") as f:
-            f.write(profile_response.content)
-        with open(f"{base_path}/heap_{curr_uuid}.pb.gz", "wb") as f:
-            f.write(heap_response.content)
-        data.append({
-            "ip": ip,
-            "namespace": namespace,
-            "service_name": service_name,
-            "profile_uuid": curr_uuid,
-        })
+    data = await capture_service_pprof(namespace, service_name)
+    text = _json_dumps(data)
+    return types.ReadResourceResult(
+        contents=[types.TextResourceContents(uri=AnyUrl(
+            "resource://pod/pprof/{namespace}/{service_name}"), text=text)]
+    )
+
+
+async def load_many_pods_pprof(items: list[tuple[str, str]]) -> list:
+    """并发采集多个服务的pprof文件, items 为 (namespace, service_name) 列表"""
+    results = await asyncio.gather(*[
+        capture_service_pprof(namespace, service_name)
+        for namespace, service_name in items
+    ])
+    return [pod for pods in results for pod in pods]
+
+
+def parse_pprof_targets(targets: str) -> list[tuple[str, str]]:
+    """解析 namespace:service_name|... 形式的采集目标, 跳过空项并去重"""
+    items = {}
+    for target in targets.split("|"):
+        target = target.strip()
+        if not target:
+            continue
+        namespace, _, service_name = target.partition(":")
+        namespace, service_name = namespace.strip(), service_name.strip()
+        if not namespace or not service_name:
+            raise ValueError(f"无效的采集目标 '{target}', 格式应为 namespace:service_name")
+        items[(namespace, service_name)] = None
+    if not items:
+        raise ValueError("未指定采集目标, 格式应为 namespace:service_name, 多个使用 | 分隔")
+    return list(items)
+
+
+@mcp.resource(uri="resource://pods/pprof/{targets}")
+async def load_services_pprof(targets: str) -> types.ReadResourceResult:
+    data = await load_many_pods_pprof(parse_pprof_targets(targets))
+    text = _json_dumps(data)
     return types.ReadResourceResult(
         contents=[types.TextResourceContents(uri=AnyUrl(
-            "resource://pod/pprof/{namespace}/{service_name}"), text=json.dumps(data, ensure_ascii=False))]
+            "resource://pods/pprof/{targets}"), text=text)]
     )
 
 
 async def get_svc_pods_ip(namespace: str, service_name: str) -> list[str]:
-    """获取服务对应的所有pod IP地址"""
-    pods = kube_cli.list_namespaced_pod(namespace)
-    pod_ip_list = []
-    for pod in pods.items:
-        if pod.metadata.labels.get("app", "") == service_name:
-            pod_ip_list.append(pod.status.pod_ip)
-            # break
+    """获取服务对应的所有pod IP地址, 结果缓存 POD_IP_CACHE_TTL 秒"""
+    key = (namespace, service_name)
+    now = time.monotonic()
+    cached = _pod_ip_cache.get(key)
+    if cached is not None and cached[0] > now:
+        _pod_ip_cache.move_to_end(key)
+        return cached[1]
+
+    pod_ip_list = await asyncio.to_thread(
+        list_running_pod_ips, get_kube_cli(), namespace, service_name)
+    _pod_ip_cache[key] = (now + POD_IP_CACHE_TTL, pod_ip_list)
+    _pod_ip_cache.move_to_end(key)
+    if len(_pod_ip_cache) > POD_IP_CACHE_SIZE:
+        _pod_ip_cache.popitem(last=False)
     return pod_ip_list
 
 
-def execute_go_tool_pprof_sync(cmd: str) -> Dict[str, Any]:
-    """同步版本的go tool pprof执行"""
-    try:
-        # 使用subprocess.run执行命令
-        result = subprocess.run(
-            cmd.split(" "),
-            capture_output=True,
-            text=True,
-            timeout=30,  # 30秒超时
-            cwd="/"
+def list_running_pod_ips(kube_cli: client.CoreV1Api, namespace: str, service_name: str) -> list[str]:
+    """分页列出运行中的pod IP, 直接解析原始JSON, 不构造V1Pod对象"""
+    pod_ip_list = []
+    continue_token = None
+    while True:
+        # 由apiserver按标签和状态过滤, 只返回运行中的目标pod
+        response = kube_cli.list_namespaced_pod(
+            namespace,
+            label_selector=f"app={service_name}",
+            field_selector="status.phase=Running",
+            limit=POD_LIST_PAGE_SIZE,
+            _continue=continue_token,
+            _preload_content=False,
         )
+        pod_list = _json_loads(response.data)
+        for pod in pod_list.get("items") or []:
+            pod_ip_list.append(pod.get("status", {}).get("podIP"))
+        continue_token = pod_list.get("metadata", {}).get("continue")
+        if not continue_token:
+            return pod_ip_list
+
+
+async def execute_go_tool_pprof(argv: list[str]) -> Dict[str, Any]:
+    """异步执行go tool pprof, 参数直接以列表传给子进程"""
+    cmd = " ".join(argv)
+    try:
+        async with _pprof_semaphore:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd="/"
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), timeout=30)  # 30秒超时
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
 
         return {
-            "success": result.returncode == 0,
+            "success": process.returncode == 0,
             "command": cmd,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
+            "stdout": stdout.decode(errors="replace"),
+            "stderr": stderr.decode(errors="replace"),
+            "returncode": process.returncode
         }
 
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         return {
             "success": False,
-            "command": cmd if 'cmd' in locals() else "unknown",
+            "command": cmd,
             "error": "命令执行超时",
             "stdout": "",
             "stderr": "",
@@ -223,7 +587,7 @@ def execute_go_tool_pprof_sync(cmd: str) -> Dict[str, Any]:
     except Exception as e:
         return {
             "success": False,
-            "command": cmd if 'cmd' in locals() else "unknown",
+            "command": cmd,
             "error": str(e),
             "stdout": "",
             "stderr": "",
@@ -231,45 +595,70 @@ def execute_go_tool_pprof_sync(cmd: str) -> Dict[str, Any]:
         }
 
 
+async def analyze_pprof_file(file_path: str, analysis_type: str) -> Dict[str, Any]:
+    """分析pprof文件, 同一文件和分析类型的成功结果直接复用"""
+    try:
+        mtime = os.stat(file_path).st_mtime
+    except OSError:
+        mtime = None
+    key = (file_path, analysis_type, mtime)
+    result = _pprof_cache.get(key)
+    if result is not None:
+        _pprof_cache.move_to_end(key)
+        return result
+
+    result = await execute_go_tool_pprof(
+        # 一个分析类型可以包含多个参数, 如 "-top -cum"
+        ["go", "tool", "pprof", *shlex.split(analysis_type), file_path])
+    # 超时等失败可能是暂时的, 不缓存
+    if result["success"]:
+        _pprof_cache[key] = result
+        if len(_pprof_cache) > PPROF_CACHE_SIZE:
+            _pprof_cache.popitem(last=False)
+    return result
+
+
 @mcp.resource(uri="resource://pod/pprof/{namespace}/{service_name}/{uuid}/{analysis_types}")
 async def get_pod_analysis_info(namespace: str, service_name: str, uuid: str, analysis_types: str) -> types.ReadResourceResult:
     """获取pod的pprof信息"""
-    profile_file_path = f"/tmp/pprof/{namespace}/{service_name}/profile_{uuid}.pb.gz"
-    heap_file_path = f"/tmp/pprof/{namespace}/{service_name}/heap_{uuid}.pb.gz"
-    print(profile_file_path, "\n", heap_file_path)
-    if not os.path.exists(profile_file_path) and not os.path.exists(heap_file_path):
+    capture_path = get_capture_path(namespace, service_name, uuid)
+    profile_file_path = f"{capture_path}/profile.pb.gz"
+    heap_file_path = f"{capture_path}/heap.pb.gz"
+    pprof_files = [
+        (pprof_type, file_path)
+        for pprof_type, file_path in (("profile", profile_file_path), ("heap", heap_file_path))
+        if os.path.exists(file_path)
+    ]
+    if not pprof_files:
         return types.ReadResourceResult(
             contents=[types.TextResourceContents(uri=AnyUrl(
                 "/pod/pprof/{namespace}/{service_name}/{uuid}/{pprof_type}"), text=f"文件不存在: {profile_file_path} 和 {heap_file_path}")]
         )
-    analysis_types = analysis_types.split("|")
-    data = []
-    if os.path.exists(profile_file_path):
-        for analysis_type in analysis_types:
-            if not analysis_type.startswith('-'):
-                analysis_type = f"-{analysis_type}"
-            cmd = f"go tool pprof {analysis_type} {profile_file_path}"
-            result = execute_go_tool_pprof_sync(
-                cmd)
-            data.append({
-                "pprof_type": "profile",
-                "analysis_type": analysis_type,
-                "analysis_result": result,
-            })
-    if os.path.exists(heap_file_path):
-        for analysis_type in analysis_types:
-            if not analysis_type.startswith('-'):
-                analysis_type = f"-{analysis_type}"
-            cmd = f"go tool pprof {analysis_type} {heap_file_path}"
-            result = execute_go_tool_pprof_sync(cmd)
-            data.append({
-                "pprof_type": "heap",
-                "analysis_type": analysis_type,
-                "analysis_result": result,
-            })
+    # 分析类型只规范化一次, 两个文件共用; 空值会变成无效参数"-", 直接跳过
+    normalized_types = tuple(
+        analysis_type if analysis_type.startswith('-') else f"-{analysis_type}"
+        for analysis_type in analysis_types.split("|")
+        if analysis_type
+    )
+    jobs = [
+        (pprof_type, analysis_type, file_path)
+        for pprof_type, file_path in pprof_files
+        for analysis_type in normalized_types
+    ]
+    # 所有分析命令并发执行
+    results = await asyncio.gather(*[
+        analyze_pprof_file(file_path, analysis_type)
+        for _, analysis_type, file_path in jobs
+    ])
+    data = [
+        AnalysisResult(pprof_type, analysis_type, result)
+        for (pprof_type, analysis_type, _), result in zip(jobs, results)
+    ]
+    # 多个go tool pprof输出拼在一起可能有数MB, 在线程中序列化
+    text = await asyncio.to_thread(_json_dumps, data)
     return types.ReadResourceResult(
         contents=[types.TextResourceContents(uri=AnyUrl(
-            "resource://pod/pprof/{namespace}/{service_name}/{uuid}/{analysis_types}"), text=json.dumps(data, ensure_ascii=False))]
+            "resource://pod/pprof/{namespace}/{service_name}/{uuid}/{analysis_types}"), text=text)]
     )
 
 
@@ -283,12 +672,15 @@ async def get_svc_metrics(namespace: str, service_name: str, metrics_port: int =
 #         await mcp.run(read_stream, write_stream)
 
 
-kube_cli = setup_ssl_from_kubeconfig()
-if kube_cli is None:
+if get_kube_cli() is None:
     print("警告: Kubernetes客户端初始化失败，某些功能可能不可用")
 
 
 if __name__ == "__main__":
+    # uvloop 可用时替换默认事件循环, 降低子进程和socket的调度开销
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     try:
         # 注册资源
         resources = list_resources()
@@ -9,13 +9,13 @@ echo "📋 检查依赖..."
 
 # 检查 Python
 if ! command -v python3 &> /dev/null; then
-    echo "❌ Python3 未找到，请先安装 Python 3.8+"
+    echo "❌ Python3 未找到，请先安装 Python 3.10+"
     exit 1
 fi
 
-# 检查 kubectl
-if ! command -v kubectl &> /dev/null; then
-    echo "❌ kubectl 未找到，请先安装和配置 kubectl"
+# 检查 kubeconfig（服务通过 Kubernetes Python 客户端直接访问集群，不依赖 kubectl）
+if [ ! -f "$HOME/.kube/config" ]; then
+    echo "❌ 未找到 ~/.kube/config，请先配置集群访问凭证"
     exit 1
 fi
 
@@ -44,6 +44,12 @@ echo "🐍 Python 信息:"
 echo "   路径: $(which python3)"
 echo "   版本: $(python3 --version)"
 
+# 检查 Python 版本（dataclass(slots=True) 等需要 3.10+）
+if ! python3 -c 'import sys; sys.exit(sys.version_info < (3, 10))'; then
+    echo "❌ Python 版本过低，请使用 Python 3.10+"
+    exit 1
+fi
+
 # 安装 Python 依赖
 echo "📦 安装 Python 依赖..."
 python3 -m pip install -r requirements.txt